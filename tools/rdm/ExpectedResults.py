@@ -20,16 +20,17 @@
 # BaseExpectedResult - the base class
 #  BroadcastResult   - expects the request to be broadcast
 #  SuccessfulResult  - expects a well formed response from the device
-#   NackResult       - parent NACK class
-#    NackGetResult   - expects GET_COMMAND_RESPONSE with a NACK
-#    NackSetResult   - expects SET_COMMAND_RESPONSE with a NACK
-#   AckResult        - parent ACK class
-#    AckGetResult    - expects GET_COMMAND_RESPONSE with an ACK
-#    AckSetResult    - expects SET_COMMAND_RESPONSE with an ACK
+#   NackResult       - expects a NACK for a command class & PID
+#   AckResult        - expects an ACK for a command class & PID
 #   QueuedMessageResult - expects an ACK or NACK for any PID other than
 #                         QUEUED_MESSAGE
+#
+# NackDiscoveryResult, NackGetResult, NackSetResult, AckDiscoveryResult,
+# AckGetResult and AckSetResult are functions which return a NackResult or
+# AckResult for the matching command class.
 
 
+from abc import ABCMeta, abstractmethod
 from ola.OlaClient import OlaClient
 from ola.PidStore import RDM_DISCOVERY, RDM_GET, RDM_SET, GetStore
 
@@ -40,12 +41,46 @@ COMMAND_CLASS_DICT = {
 }
 
 
+# Response codes & types, bound once since they're checked for every response.
+_RDM_ACK = OlaClient.RDM_ACK
+_RDM_COMPLETED_OK = OlaClient.RDM_COMPLETED_OK
+_RDM_DUB_RESPONSE = OlaClient.RDM_DUB_RESPONSE
+_RDM_INVALID_RESPONSE = OlaClient.RDM_INVALID_RESPONSE
+_RDM_NACK_REASON = OlaClient.RDM_NACK_REASON
+_RDM_PLUGIN_DISCOVERY_NOT_SUPPORTED = (
+    OlaClient.RDM_PLUGIN_DISCOVERY_NOT_SUPPORTED)
+_RDM_TIMEOUT = OlaClient.RDM_TIMEOUT
+_RDM_WAS_BROADCAST = OlaClient.RDM_WAS_BROADCAST
+
+# The response types that QueuedMessageResult accepts.
+_QUEUED_MESSAGE_RESPONSE_TYPES = frozenset([_RDM_ACK, _RDM_NACK_REASON])
+
+# Marks a field that is missing from the unpacked data.
+_MISSING = object()
+
+# The value of the QUEUED_MESSAGE pid, looked up on first use.
+_queued_message_pid_value = None
+
+
 def _CommandClassToString(command_class):
   return COMMAND_CLASS_DICT[command_class]
 
 
-class BaseExpectedResult(object):
+def _GetQueuedMessagePidValue():
+  global _queued_message_pid_value
+  if _queued_message_pid_value is None:
+    _queued_message_pid_value = GetStore().GetName('QUEUED_MESSAGE').value
+  return _queued_message_pid_value
+
+
+# Works with both the Python 2 and 3 metaclass syntax.
+_AbstractBase = ABCMeta('_AbstractBase', (object,), {'__slots__': ()})
+
+
+class BaseExpectedResult(_AbstractBase):
   """The base class for expected results."""
+  __slots__ = ('_action', '_messages')
+
   def __init__(self,
                action=None,
                warning=None,
@@ -58,8 +93,8 @@ class BaseExpectedResult(object):
       advisory: An advisory message to log is this result matches
     """
     self._action = action
-    self._warning_messae = warning
-    self._advisory_message = advisory
+    # (warning, advisory)
+    self._messages = (warning, advisory)
 
   @property
   def action(self):
@@ -67,12 +102,13 @@ class BaseExpectedResult(object):
 
   @property
   def warning(self):
-    return self._warning_messae
+    return self._messages[0]
 
   @property
   def advisory(self):
-    return self._advisory_message
+    return self._messages[1]
 
+  @abstractmethod
   def Matches(self, response, unpacked_data):
     """Check if the response we received matches this object.
 
@@ -81,53 +117,62 @@ class BaseExpectedResult(object):
       unpacked_data: A dict of field name : value mappings that were present in
         the response.
     """
-    raise TypeError('Base method called')
 
 
 class BroadcastResult(BaseExpectedResult):
   """This checks that the request was broadcast."""
+  __slots__ = ()
+
   def __str__(self):
     return 'RDM_WAS_BROADCAST'
 
   def Matches(self, response, unpacked_data):
-    return OlaClient.RDM_WAS_BROADCAST == response.response_code
+    return _RDM_WAS_BROADCAST == response.response_code
 
 
 class TimeoutResult(BaseExpectedResult):
   """This checks that the request timed out."""
+  __slots__ = ()
+
   def __str__(self):
     return 'RDM_TIMEOUT'
 
   def Matches(self, response, unpacked_data):
-    return OlaClient.RDM_TIMEOUT == response.response_code
+    return _RDM_TIMEOUT == response.response_code
 
 
 class InvalidResponse(BaseExpectedResult):
   """This checks that we got an invalid response back."""
+  __slots__ = ()
+
   def __str__(self):
     return 'RDM_INVALID_RESPONSE'
 
   def Matches(self, response, unpacked_data):
-    return OlaClient.RDM_INVALID_RESPONSE == response.response_code
+    return _RDM_INVALID_RESPONSE == response.response_code
 
 
 class UnsupportedResult(BaseExpectedResult):
   """This checks that the request was unsupported."""
+  __slots__ = ()
+
   def __str__(self):
     return 'RDM_PLUGIN_DISCOVERY_NOT_SUPPORTED'
 
   def Matches(self, response, unpacked_data):
-    return (OlaClient.RDM_PLUGIN_DISCOVERY_NOT_SUPPORTED ==
+    return (_RDM_PLUGIN_DISCOVERY_NOT_SUPPORTED ==
             response.response_code)
 
 
 class DUBResult(BaseExpectedResult):
   """Checks that the result was a DUB response."""
+  __slots__ = ()
+
   def __str__(self):
     return 'RDM_DUB_RESPONSE'
 
   def Matches(self, response, unpacked_data):
-    return OlaClient.RDM_DUB_RESPONSE == response.response_code
+    return _RDM_DUB_RESPONSE == response.response_code
 
 
 class SuccessfulResult(BaseExpectedResult):
@@ -137,34 +182,35 @@ class SuccessfulResult(BaseExpectedResult):
   message was formed correctly. Other classes inherit from this an perform more
   specific checking.
   """
+  __slots__ = ()
+
   def __str__(self):
     return 'RDM_COMPLETED_OK'
 
   def Matches(self, response, unpacked_data):
-    return response.response_code == OlaClient.RDM_COMPLETED_OK
+    return response.response_code == _RDM_COMPLETED_OK
 
 
 class QueuedMessageResult(SuccessfulResult):
   """This checks for a valid response to a QUEUED_MESSAGE request."""
+  __slots__ = ()
+
   def __str__(self):
     return 'It\'s complicated'
 
   def Matches(self, response, unpacked_data):
-    ok = super(QueuedMessageResult, self).Matches(response, unpacked_data)
-
-    if not ok:
+    if response.response_code != _RDM_COMPLETED_OK:
       return False
 
-    pid_store = GetStore()
-    queued_message_pid = pid_store.GetName('QUEUED_MESSAGE')
-
-    return ((response.response_type == OlaClient.RDM_NACK_REASON or
-             response.response_type == OlaClient.RDM_ACK) and
-             response.pid != queued_message_pid.value)
+    return (response.response_type in _QUEUED_MESSAGE_RESPONSE_TYPES and
+            response.pid != _GetQueuedMessagePidValue())
 
 
 class NackResult(SuccessfulResult):
   """This checks that the device nacked the request."""
+  __slots__ = ('_command_class', '_command_class_str', '_pid_id',
+               '_nack_reason', '_str')
+
   def __init__(self,
                command_class,
                pid_id,
@@ -185,108 +231,96 @@ class NackResult(SuccessfulResult):
     super(NackResult, self).__init__(action, warning, advisory)
 
     self._command_class = command_class
+    self._command_class_str = _CommandClassToString(command_class)
     self._pid_id = pid_id
     self._nack_reason = nack_reason
+    self._str = None
 
   def __str__(self):
-    return ('CC: %s, PID 0x%04hx, NACK %s' %
-            (_CommandClassToString(self._command_class),
-             self._pid_id,
-             self._nack_reason))
+    if self._str is None:
+      self._str = ('CC: %s, PID 0x%04hx, NACK %s' %
+                   (self._command_class_str,
+                    self._pid_id,
+                    self._nack_reason))
+    return self._str
 
   def Matches(self, response, unpacked_data):
-    ok = super(NackResult, self).Matches(response, unpacked_data)
-
-    return (ok and
-            response.response_type == OlaClient.RDM_NACK_REASON and
-            response.command_class == self._command_class and
-            response.pid == self._pid_id and
-            response.nack_reason == self._nack_reason)
-
-
-class NackDiscoveryResult(NackResult):
-  """This checks that the device nacked a Discovery request."""
-  def __init__(self,
-               pid_id,
-               nack_reason,
-               action=None,
-               warning=None,
-               advisory=None):
-    """Create an expected result object which is a NACK for a Discovery
-      request.
-
-    Args:
-      pid_id: The pid id we expect to have been nack'ed
-      nack_reason: The RDMNack object we expect.
-      action: The action to run if this result matches
-      warning: A warning message to log is this result matches
-      advisory: An advisory message to log is this result matches
-    """
-    super(NackDiscoveryResult, self).__init__(RDM_DISCOVERY,
-                                              pid_id,
-                                              nack_reason,
-                                              action,
-                                              warning,
-                                              advisory)
-
-
-class NackGetResult(NackResult):
-  """This checks that the device nacked a GET request."""
-  def __init__(self,
-               pid_id,
-               nack_reason,
-               action=None,
-               warning=None,
-               advisory=None):
-    """Create an expected result object which is a NACK for a GET request.
-
-    Args:
-      pid_id: The pid id we expect to have been nack'ed
-      nack_reason: The RDMNack object we expect.
-      action: The action to run if this result matches
-      warning: A warning message to log is this result matches
-      advisory: An advisory message to log is this result matches
-    """
-    super(NackGetResult, self).__init__(RDM_GET,
-                                        pid_id,
-                                        nack_reason,
-                                        action,
-                                        warning,
-                                        advisory)
-
-
-class NackSetResult(NackResult):
-  """This checks that the device nacked a SET request."""
-  def __init__(self,
-               pid_id,
-               nack_reason,
-               action=None,
-               warning=None,
-               advisory=None):
-    """Create an expected result object which is a NACK for a SET request.
+    if (response.response_code != _RDM_COMPLETED_OK or
+        response.response_type != _RDM_NACK_REASON or
+        response.command_class != self._command_class or
+        response.pid != self._pid_id):
+      return False
 
-    Args:
-      pid_id: The pid id we expect to have been nack'ed
-      nack_reason: The RDMNack object we expect.
-      action: The action to run if this result matches
-      warning: A warning message to log is this result matches
-      advisory: An advisory message to log is this result matches
-    """
-    super(NackSetResult, self).__init__(RDM_SET,
-                                        pid_id,
-                                        nack_reason,
-                                        action,
-                                        warning,
-                                        advisory)
+    # RDMNack.LookupCode returns the shared object for known codes, so this is
+    # usually an identity match. Fall back to == for unknown codes.
+    nack_reason = response.nack_reason
+    return (nack_reason is self._nack_reason or
+            nack_reason == self._nack_reason)
+
+
+def NackDiscoveryResult(pid_id,
+                        nack_reason,
+                        action=None,
+                        warning=None,
+                        advisory=None):
+  """Create an expected result object which is a NACK for a Discovery request.
+
+  Args:
+    pid_id: The pid id we expect to have been nack'ed
+    nack_reason: The RDMNack object we expect.
+    action: The action to run if this result matches
+    warning: A warning message to log is this result matches
+    advisory: An advisory message to log is this result matches
+  """
+  return NackResult(RDM_DISCOVERY, pid_id, nack_reason, action, warning,
+                    advisory)
+
+
+def NackGetResult(pid_id,
+                  nack_reason,
+                  action=None,
+                  warning=None,
+                  advisory=None):
+  """Create an expected result object which is a NACK for a GET request.
+
+  Args:
+    pid_id: The pid id we expect to have been nack'ed
+    nack_reason: The RDMNack object we expect.
+    action: The action to run if this result matches
+    warning: A warning message to log is this result matches
+    advisory: An advisory message to log is this result matches
+  """
+  return NackResult(RDM_GET, pid_id, nack_reason, action, warning, advisory)
+
+
+def NackSetResult(pid_id,
+                  nack_reason,
+                  action=None,
+                  warning=None,
+                  advisory=None):
+  """Create an expected result object which is a NACK for a SET request.
+
+  Args:
+    pid_id: The pid id we expect to have been nack'ed
+    nack_reason: The RDMNack object we expect.
+    action: The action to run if this result matches
+    warning: A warning message to log is this result matches
+    advisory: An advisory message to log is this result matches
+  """
+  return NackResult(RDM_SET, pid_id, nack_reason, action, warning, advisory)
 
 
 class AckResult(SuccessfulResult):
   """This checks that the device ack'ed the request."""
+  __slots__ = ('_command_class', '_command_class_str', '_pid_id',
+               '_field_names', '_field_names_set', '_field_values',
+               '_field_values_items', '_str')
+
   def __init__(self,
                command_class,
                pid_id,
-               field_names=[],
-               field_values={},
+               field_names=None,
+               field_values=None,
                action=None,
                warning=None,
                advisory=None):
@@ -304,126 +338,106 @@ class AckResult(SuccessfulResult):
     super(AckResult, self).__init__(action, warning, advisory)
 
     self._command_class = command_class
+    self._command_class_str = _CommandClassToString(command_class)
     self._pid_id = pid_id
-    self._field_names = field_names
-    self._field_values = field_values
+    self._field_names = field_names or []
+    self._field_names_set = frozenset(self._field_names)
+    self._field_values = field_values or {}
+    self._field_values_items = tuple(self._field_values.items())
+    self._str = None
 
   def __str__(self):
-    return ('CC: %s, PID 0x%04hx, ACK, fields %s, values %s' % (
-            _CommandClassToString(self._command_class),
-            self._pid_id,
-            self._field_names,
-            self._field_values))
+    if self._str is None:
+      self._str = ('CC: %s, PID 0x%04hx, ACK, fields %s, values %s' % (
+                   self._command_class_str,
+                   self._pid_id,
+                   self._field_names,
+                   self._field_values))
+    return self._str
 
   def Matches(self, response, unpacked_data):
-    ok = super(AckResult, self).Matches(response, unpacked_data)
-
-    if (not ok or
-        response.response_type != OlaClient.RDM_ACK or
+    if (response.response_code != _RDM_COMPLETED_OK or
+        response.response_type != _RDM_ACK or
         response.command_class != self._command_class or
         response.pid != self._pid_id):
       return False
 
     # unpacked_data may be either a list of dicts, or a dict
-    if isinstance(unpacked_data, list):
-      for item in unpacked_data:
-        field_keys = set(item.keys())
-        for field in self._field_names:
-          if field not in field_keys:
-            return False
+    if type(unpacked_data) is list:
+      # field values can only match a single dict
+      if self._field_values_items:
+        return False
+      items = unpacked_data
     else:
-      field_keys = set(unpacked_data.keys())
-      for field in self._field_names:
-        if field not in field_keys:
-          return False
+      items = (unpacked_data,)
 
-    for field, value in self._field_values.iteritems():
-      if field not in unpacked_data:
+    field_names = self._field_names_set
+    for item in items:
+      if not field_names.issubset(item):
         return False
-      if value != unpacked_data[field]:
+
+    for field, value in self._field_values_items:
+      actual = unpacked_data.get(field, _MISSING)
+      if actual is _MISSING or actual != value:
         return False
     return True
 
 
-class AckDiscoveryResult(AckResult):
-  """This checks that the device ack'ed a DISCOVERY request."""
-  def __init__(self,
-               pid_id,
-               field_names=[],
-               field_values={},
-               action=None,
-               warning=None,
-               advisory=None):
-    """Create an expected result object which is an ACK for a DISCOVERY request.
-
-    Args:
-      pid_id: The pid id we expect
-      field_names: Check that these fields are present in the response
-      field_values: Check that fields & values are present in the response
-      action: The action to run if this result matches
-      warning: A warning message to log is this result matches
-      advisory: An advisory message to log is this result matches
-    """
-    super(AckDiscoveryResult, self).__init__(RDM_DISCOVERY,
-                                             pid_id,
-                                             field_names,
-                                             field_values,
-                                             action,
-                                             warning,
-                                             advisory)
-
-
-class AckGetResult(AckResult):
-  """This checks that the device ack'ed a GET request."""
-  def __init__(self,
-               pid_id,
-               field_names=[],
-               field_values={},
-               action=None,
-               warning=None,
-               advisory=None):
-    """Create an expected result object which is an ACK for a GET request.
-
-    Args:
-      pid_id: The pid id we expect
-      field_names: Check that these fields are present in the response
-      field_values: Check that fields & values are present in the response
-      action: The action to run if this result matches
-      warning: A warning message to log is this result matches
-      advisory: An advisory message to log is this result matches
-    """
-    super(AckGetResult, self).__init__(RDM_GET,
-                                       pid_id,
-                                       field_names,
-                                       field_values,
-                                       action,
-                                       warning,
-                                       advisory)
-
-
-class AckSetResult(AckResult):
-  """This checks that the device ack'ed a SET request."""
-  def __init__(self,
-               pid_id,
-               field_names=[],
-               field_values={},
-               action=None,
-               warning=None,
-               advisory=None):
-    """Create an expected result object which is an ACK for a SET request.
-
-    Args:
-      pid_id: The pid id we expect
-      field_names: Check that these fields are present in the response
-      field_values: Check that fields & values are present in the response
-      action: The action to run if this result matches
-      warning: A warning message to log is this result matches
-      advisory: An advisory message to log is this result matches
-    """
-    super(AckSetResult, self).__init__(RDM_SET,
-                                       pid_id,
-                                       field_names,
-                                       field_values,
-                                       action,
-                                       warning,
-                                       advisory)
+def AckDiscoveryResult(pid_id,
+                       field_names=None,
+                       field_values=None,
+                       action=None,
+                       warning=None,
+                       advisory=None):
+  """Create an expected result object which is an ACK for a DISCOVERY request.
+
+  Args:
+    pid_id: The pid id we expect
+    field_names: Check that these fields are present in the response
+    field_values: Check that fields & values are present in the response
+    action: The action to run if this result matches
+    warning: A warning message to log is this result matches
+    advisory: An advisory message to log is this result matches
+  """
+  return AckResult(RDM_DISCOVERY, pid_id, field_names, field_values, action,
+                   warning, advisory)
+
+
+def AckGetResult(pid_id,
+                 field_names=None,
+                 field_values=None,
+                 action=None,
+                 warning=None,
+                 advisory=None):
+  """Create an expected result object which is an ACK for a GET request.
+
+  Args:
+    pid_id: The pid id we expect
+    field_names: Check that these fields are present in the response
+    field_values: Check that fields & values are present in the response
+    action: The action to run if this result matches
+    warning: A warning message to log is this result matches
+    advisory: An advisory message to log is this result matches
+  """
+  return AckResult(RDM_GET, pid_id, field_names, field_values, action,
+                   warning, advisory)
+
+
+def AckSetResult(pid_id,
+                 field_names=None,
+                 field_values=None,
+                 action=None,
+                 warning=None,
+                 advisory=None):
+  """Create an expected result object which is an ACK for a SET request.
+
+  Args:
+    pid_id: The pid id we expect
+    field_names: Check that these fields are present in the response
+    field_values: Check that fields & values are present in the response
+    action: The action to run if this result matches
+    warning: A warning message to log is this result matches
+    advisory: An advisory message to log is this result matches
+  """
+  return AckResult(RDM_SET, pid_id, field_names, field_values, action,
+                   warning, advisory)